@@ -1,20 +1,28 @@
 # create base route
 
+from contextlib import asynccontextmanager
 from typing import List
 from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import logging
-from embedding_pipeline.vector_db import VectorDB, CookingAssistant
+from embedding_pipeline.vector_db import VectorDB, CookingAssistant, close_http_client
 from fastapi.staticfiles import StaticFiles
 import os
+import json
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_http_client()
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 api_router = APIRouter()
 
 # Add CORS middleware
@@ -43,12 +51,31 @@ async def chat(message: ChatMessage):
     Process a chat message and return a response.
     """
     try:
-        response = cooking_assistant.process_message(message.message)
+        response = await cooking_assistant.process_message(message.message)
         return {"response": response}
     except Exception as e:
         logger.error(f"Error processing chat message: {str(e)}")
         return {"error": "Sorry, I encountered an error while processing your message. Please try again."}
 
+@api_router.post("/chat/stream")
+async def chat_stream(message: ChatMessage):
+    """
+    Process a chat message and stream the response as server-sent events.
+    Each `data:` event carries a JSON-encoded text chunk. An `error` event carries a
+    message that replaces the partial response, and a final `done` event ends the stream.
+    """
+    async def event_stream():
+        async for event, text in cooking_assistant.stream_message(message.message):
+            if event == 'error':
+                yield f"event: error\ndata: {json.dumps(text)}\n\n"
+            else:
+                yield f"data: {json.dumps(text)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    # Stop proxies from caching or buffering the stream
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
+
 @app.post("/getem/{keywords}")
 async def get_em(keywords: str):
     """
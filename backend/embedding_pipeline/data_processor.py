@@ -1,6 +1,6 @@
-import pandas as pd
+import polars as pl
 import logging
-from typing import List, Dict, Tuple
+from typing import Iterator, List, Dict, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -8,32 +8,42 @@ class DataProcessor:
     def __init__(self, csv_path: str):
         self.csv_path = csv_path
         
-    def get_processed_data(self) -> Tuple[List[str], List[Dict]]:
-        """Process the recipe data from CSV and return texts for embeddings and full metadata.
+    def get_processed_data(self, chunk_size: int = 1024) -> Iterator[Tuple[List[str], List[Dict]]]:
+        """Process the recipe data from CSV and yield texts for embeddings and full metadata in chunks.
 
-        Returns:
-            Tuple[List[str], List[Dict]]: List of recipe texts and their full metadata.
+        Args:
+            chunk_size (int): Number of recipes per yielded chunk.
+
+        Yields:
+            Tuple[List[str], List[Dict]]: Recipe texts and their full metadata for one chunk.
         """
         try:
-            df = pd.read_csv(self.csv_path)
+            # Polars parses the CSV and builds the texts with multi-threaded native kernels
+            df = pl.read_csv(self.csv_path, infer_schema_length=0)
+            
+            def column(name: str) -> pl.Expr:
+                # Missing columns and empty cells contribute an empty string
+                return pl.col(name).cast(pl.Utf8).fill_null("") if name in df.columns else pl.lit("")
             
             # Create the text for embedding generation
             # Use all relevant fields to create a rich text representation
-            recipe_texts = df.apply(
-                lambda row: f"Recipe: {row.get('RecipeName', '')}. "
-                           f"Ingredients: {row.get('Ingredients', '')}. "
-                           f"TimeToCook: {row.get('TimeToCook', '')}. "
-                           f"Instructions: {row.get('Instructions', '')}",
-                axis=1
-            ).tolist()
+            text_expr = pl.concat_str([
+                pl.lit("Recipe: "), column('RecipeName'),
+                pl.lit(". Ingredients: "), column('Ingredients'),
+                pl.lit(". TimeToCook: "), column('TimeToCook'),
+                pl.lit(". Instructions: "), column('Instructions')
+            ]).alias('text')
+            
+            for chunk in df.iter_slices(n_rows=chunk_size):
+                recipe_texts = chunk.select(text_expr).to_series().to_list()
 
-            # Keep ALL original columns as metadata
-            # The vector_db will select the necessary columns for insertion
-            metadata = df.to_dict('records')
+                # Keep ALL original columns as metadata
+                # The vector_db will select the necessary columns for insertion
+                metadata = chunk.to_dicts()
+                
+                yield recipe_texts, metadata
             
-            logger.info(f"Successfully processed {len(df)} recipes. Metadata includes all original columns.")
-            return recipe_texts, metadata
+            logger.info(f"Successfully processed {df.height} recipes. Metadata includes all original columns.")
         except Exception as e:
             logger.error(f"Error processing data: {str(e)}")
             raise 
-        
@@ -1,187 +1,153 @@
-import requests #make API requests
-from typing import List, Dict #type hints
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple #type hints
 import numpy as np #numerical operations
 import logging #logging
-from tqdm import tqdm #progress bar
-import time #time operations
 import os #file operations
-from dotenv import load_dotenv #parse environment variables
-from requests.exceptions import RequestException #request exceptions
-import json #json operations
-import pickle #pickle operations
+import json #checkpoint sidecar
+import torch #device detection
+from sentence_transformers import SentenceTransformer #local embedding model
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class EmbeddingGenerator:
-    def __init__(self, model_name: str = 'BAAI/bge-base-en-v1.5'):
+    def __init__(self, model_name: str = 'BAAI/bge-base-en-v1.5', device: Optional[str] = None, checkpoint_dir: str = 'checkpoints'):
         """
-        Initialize the embedding generator with HuggingFace API.
+        Initialize the embedding generator with a local SentenceTransformer model.
+
+        Args:
+            model_name (str): HuggingFace model id to load
+            device (Optional[str]): Device to run on; defaults to CUDA when available, else CPU
+            checkpoint_dir (str): Directory for the embedding checkpoint of interrupted runs
         """
-        # Load environment variables
-        load_dotenv()
-        
-        self.model = model_name
-        self.api_url = f"https://api-inference.huggingface.co/models/{model_name}"
-        
-        # Get and verify token
-        self.token = os.getenv('HF_TOKEN')
-        logger.info(f"Token found: {'Yes' if self.token else 'No'}")
-        if not self.token:
-            raise ValueError("HF_TOKEN not found in environment variables. Please add it to your .env file")
-            
-        self.headers = {"Authorization": f"Bearer {self.token}"}
-        logger.info(f"Initialized embedding generator with model: {model_name}")
-        
+        if device is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+
+        self.model_name = model_name
+        self.device = device
+        self.model = SentenceTransformer(model_name, device=device)
+        logger.info(f"Initialized embedding generator with model: {model_name} on {device}")
+
         # Create checkpoint directory if it doesn't exist
-        self.checkpoint_dir = "checkpoints"
+        self.checkpoint_dir = checkpoint_dir
         os.makedirs(self.checkpoint_dir, exist_ok=True)
+        self.checkpoint_path = os.path.join(self.checkpoint_dir, 'embedding_checkpoint.f32')
+        self.checkpoint_info_path = os.path.join(self.checkpoint_dir, 'embedding_checkpoint.json')
+        self.dim = self.model.get_sentence_embedding_dimension()
         
-    def _make_api_request(self, texts: List[str], max_retries: int = 5) -> List:
-        """
-        Make API request with retry logic.
-        
-        Args:
-            texts (List[str]): List of texts to process
-            max_retries (int): Maximum number of retry attempts
-            
-        Returns:
-            List: Embeddings for the texts
+    def _checkpoint_info(self, source_path: Optional[str]) -> Optional[Dict]:
+        """Describe the input and model a checkpoint belongs to, or None if the source is unknown."""
+        if source_path is None:
+            return None
+        stat = os.stat(source_path)
+        return {
+            'source_path': os.path.abspath(source_path),
+            'source_size': stat.st_size,
+            'source_mtime': stat.st_mtime,
+            'model_name': self.model_name,
+            'dim': self.dim
+        }
+
+    def _load_checkpoint(self, info: Optional[Dict]) -> np.ndarray:
+        """Memory-map the embeddings saved by an interrupted run on the same input, read-only.
+
+        A checkpoint whose sidecar does not match the current CSV and model is discarded.
         """
-        for attempt in range(max_retries):
+        saved_info = None
+        if os.path.exists(self.checkpoint_info_path):
             try:
-                response = requests.post(
-                    self.api_url,
-                    headers=self.headers,
-                    json={"inputs": texts}
-                )
-                
-                if response.status_code == 503:
-                    # Model is loading
-                    wait_time = 20
-                    logger.info(f"Model is loading, waiting {wait_time} seconds...")
-                    time.sleep(wait_time)
-                    continue
-                    
-                if response.status_code == 429:
-                    # Rate limit hit
-                    wait_time = 30
-                    logger.info(f"Rate limit hit, waiting {wait_time} seconds...")
-                    time.sleep(wait_time)
-                    continue
-                    
-                if response.status_code == 500:
-                    # Internal server error
-                    wait_time = 30 * (attempt + 1)
-                    logger.warning(f"Server error, retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
-                    continue
-                    
-                response.raise_for_status()
-                return response.json()
-                
-            except RequestException as e:
-                if attempt == max_retries - 1:
-                    raise
-                wait_time = 10 * (attempt + 1)
-                logger.warning(f"Request failed, retrying in {wait_time} seconds... Error: {str(e)}")
-                time.sleep(wait_time)
-    
-    def _save_checkpoint(self, batch_index: int, embeddings: List, metadata: List[Dict]):
-        """Save progress to checkpoint file."""
-        checkpoint = {
-            'batch_index': batch_index,
-            'embeddings': embeddings,
-            'metadata': metadata
-        }
-        with open(os.path.join(self.checkpoint_dir, 'embedding_checkpoint.pkl'), 'wb') as f:
-            pickle.dump(checkpoint, f)
-        logger.info(f"Saved checkpoint at batch {batch_index}")
+                with open(self.checkpoint_info_path) as f:
+                    saved_info = json.load(f)
+            except ValueError:
+                logger.warning("Ignoring unreadable embedding checkpoint sidecar")
+        
+        if info is None or saved_info != info:
+            if os.path.exists(self.checkpoint_path):
+                logger.info("Discarding embedding checkpoint from a different input or model")
+            self._clear_checkpoint()
+            if info is not None:
+                with open(self.checkpoint_info_path, 'w') as f:
+                    json.dump(info, f)
+            return np.empty((0, self.dim), dtype=np.float32)
+        
+        if not os.path.exists(self.checkpoint_path):
+            return np.empty((0, self.dim), dtype=np.float32)
+        
+        # Drop a partially written trailing row so appends stay row-aligned
+        row_bytes = self.dim * np.dtype(np.float32).itemsize
+        rows = os.path.getsize(self.checkpoint_path) // row_bytes
+        os.truncate(self.checkpoint_path, rows * row_bytes)
+        if rows == 0:
+            return np.empty((0, self.dim), dtype=np.float32)
+        
+        logger.info(f"Loaded checkpoint with {rows} embeddings")
+        return np.memmap(self.checkpoint_path, dtype=np.float32, mode='r', shape=(rows, self.dim))
     
-    def _load_checkpoint(self) -> tuple:
-        """Load progress from checkpoint file."""
-        checkpoint_path = os.path.join(self.checkpoint_dir, 'embedding_checkpoint.pkl')
-        if os.path.exists(checkpoint_path):
-            with open(checkpoint_path, 'rb') as f:
-                checkpoint = pickle.load(f)
-            logger.info(f"Loaded checkpoint from batch {checkpoint['batch_index']}")
-            return checkpoint['batch_index'], checkpoint['embeddings'], checkpoint['metadata']
-        return 0, [], []
+    def _clear_checkpoint(self):
+        """Remove the checkpoint and its sidecar."""
+        for path in (self.checkpoint_path, self.checkpoint_info_path):
+            if os.path.exists(path):
+                os.remove(path)
         
-    def generate_embeddings(self, texts: List[str], metadata: List[Dict], batch_size: int = 32) -> np.ndarray:
+    def generate_embeddings(self, texts: List[str], metadata: List[Dict], batch_size: int = 128, show_progress_bar: bool = True) -> Tuple[np.ndarray, List[Dict]]:
         """
-        Generate embeddings for a list of texts using HuggingFace API.
+        Generate embeddings for a list of texts using the local model.
         
         Args:
             texts (List[str]): List of texts to generate embeddings for
             metadata (List[Dict]): List of recipe metadata
             batch_size (int): Batch size for processing
+            show_progress_bar (bool): Whether to display a progress bar while encoding
             
         Returns:
-            np.ndarray: Array of embeddings
+            Tuple[np.ndarray, List[Dict]]: Array of float32 embeddings and the metadata passed in
         """
         logger.info(f"Generating embeddings for {len(texts)} texts")
         
-        # Load checkpoint if exists
-        start_batch, all_embeddings, processed_metadata = self._load_checkpoint()
-        
-        # Process in batches
-        for i in tqdm(range(start_batch * batch_size, len(texts), batch_size), desc="Generating embeddings"):
-            batch_texts = texts[i:i + batch_size]
-            batch_metadata = metadata[i:i + batch_size]
-            
-            try:
-                logger.info(f"Processing batch {i//batch_size + 1}/{(len(texts) + batch_size - 1)//batch_size}")
-                batch_embeddings = self._make_api_request(batch_texts)
-                all_embeddings.extend(batch_embeddings)
-                processed_metadata.extend(batch_metadata)
-                
-                # Save checkpoint every 5 batches
-                if (i//batch_size) % 5 == 0:
-                    self._save_checkpoint(i//batch_size, all_embeddings, processed_metadata)
+        embeddings = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=show_progress_bar
+        ).astype(np.float32, copy=False)
                 
-                # Add a small delay between batches
-                time.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"Error generating embeddings for batch {i}: {str(e)}")
-                # Save checkpoint before raising error
-                self._save_checkpoint(i//batch_size, all_embeddings, processed_metadata)
-                raise
-                
-        embeddings = np.array(all_embeddings)
         logger.info(f"Generated embeddings with shape: {embeddings.shape}")
-        return embeddings, processed_metadata
+        return embeddings, metadata
     
-    def process_recipes(self, recipe_texts: List[str], metadata: List[Dict], batch_size: int = 32) -> List[Dict]:
+    def process_recipes(self, chunks: Iterable[Tuple[List[str], List[Dict]]], batch_size: int = 128, source_path: Optional[str] = None) -> Iterator[Tuple[np.ndarray, List[Dict]]]:
         """
-        Process recipes by generating embeddings and combining with metadata.
+        Process recipes chunk by chunk by generating embeddings and assigning recipe ids.
         
         Args:
-            recipe_texts (List[str]): List of recipe texts
-            metadata (List[Dict]): List of recipe metadata
+            chunks (Iterable[Tuple[List[str], List[Dict]]]): Chunks of recipe texts and their metadata
             batch_size (int): Batch size for processing
+            source_path (Optional[str]): CSV the chunks were read from; an interrupted run is only
+                resumed from its checkpoint for the same file and model (never when omitted)
             
-        Returns:
-            List[Dict]: List of recipes with their embeddings and metadata
+        Yields:
+            Tuple[np.ndarray, List[Dict]]: Float32 embeddings and metadata (with 'id') for one chunk
         """
-        embeddings, processed_metadata = self.generate_embeddings(recipe_texts, metadata, batch_size)
+        # Embeddings from an interrupted run are reused instead of re-encoded;
+        # new ones are appended to the checkpoint file as each chunk is encoded
+        checkpoint = self._load_checkpoint(self._checkpoint_info(source_path))
         
-        processed_recipes = []
-        for i, (text, meta, embedding) in enumerate(zip(recipe_texts, processed_metadata, embeddings)):
-            # Split the text into RecipeName and Instructions
-            parts = text.split(' ', 1)
-            recipe_name = parts[0]
-            instructions = parts[1] if len(parts) > 1 else ''
-            
-            processed_recipe = {
-                'id': i,
-                'RecipeName': recipe_name,
-                'Instructions': instructions,
-                'embedding': embedding.tolist(),
-                **meta
-            }
-            processed_recipes.append(processed_recipe)
-            
-        logger.info(f"Processed {len(processed_recipes)} recipes with embeddings")
-        return processed_recipes
+        total = 0
+        with open(self.checkpoint_path, 'ab') as checkpoint_file:
+            for recipe_texts, metadata in chunks:
+                done = max(0, min(len(recipe_texts), len(checkpoint) - total))
+                embeddings = np.array(checkpoint[total:total + done])
+                
+                if done < len(recipe_texts):
+                    new_embeddings, _ = self.generate_embeddings(recipe_texts[done:], metadata[done:], batch_size, show_progress_bar=False)
+                    new_embeddings.tofile(checkpoint_file)
+                    checkpoint_file.flush()
+                    embeddings = np.concatenate([embeddings, new_embeddings]) if done else new_embeddings
+                
+                metadata = [{'id': total + i, **meta} for i, meta in enumerate(metadata)]
+                total += len(metadata)
+                yield embeddings, metadata
+        
+        del checkpoint
+        self._clear_checkpoint()
+        logger.info("Removed embedding checkpoint")
+        logger.info(f"Processed {total} recipes with embeddings")
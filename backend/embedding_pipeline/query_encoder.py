@@ -0,0 +1,60 @@
+import re #regular expressions
+import threading #thread safety
+from collections import OrderedDict #LRU bookkeeping
+import logging #logging
+import numpy as np #numerical operations
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+class QueryEncoder:
+    def __init__(self, model_name: str = 'BAAI/bge-base-en-v1.5', max_size: int = 10000):
+        """
+        Initialize a query encoder that memoizes embeddings of recently seen queries.
+
+        Args:
+            model_name (str): HuggingFace model id to load
+            max_size (int): Maximum number of cached query embeddings; least recently used are evicted
+        """
+        # Imported here so importing this module (and vector_db) does not pull in torch
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.max_size = max_size
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """
+        Lightly normalize a query so trivially different phrasings share a cache key.
+        """
+        return _WHITESPACE.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+
+    def encode(self, text: str) -> np.ndarray:
+        """
+        Return the normalized embedding of a query, running the model only on a cache miss.
+
+        Args:
+            text (str): Query text
+
+        Returns:
+            np.ndarray: Normalized float32 embedding
+        """
+        key = self._normalize(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                return vector
+
+        vector = self.model.encode([text], normalize_embeddings=True)[0].astype(np.float32, copy=False)
+
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return vector
@@ -0,0 +1,77 @@
+import threading #thread safety
+import time #entry timestamps
+from typing import List, Optional #type hints
+import logging #logging
+import numpy as np #numerical operations
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    def __init__(self, dim: int = 768, threshold: float = 0.92, max_size: int = 2000, ttl_seconds: float = 7 * 24 * 3600):
+        """
+        Initialize an in-memory cache of answers keyed by normalized query embeddings.
+
+        Args:
+            dim (int): Dimension of the query embeddings
+            threshold (float): Minimum cosine similarity for a cached answer to be reused
+            max_size (int): Maximum number of entries; the least recently used entry is evicted when full
+            ttl_seconds (float): Age after which an entry is no longer served
+        """
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self.V = np.zeros((max_size, dim), dtype=np.float32)
+        self.answers: List[Optional[str]] = [None] * max_size
+        self.created_at = np.zeros(max_size, dtype=np.float64)
+        self.last_used = np.zeros(max_size, dtype=np.float64)
+        self.size = 0
+        self._lock = threading.Lock()
+
+    def query(self, vec: np.ndarray) -> Optional[str]:
+        """
+        Return the cached answer of the most similar live entry, if it is similar enough.
+
+        Args:
+            vec (np.ndarray): Normalized query embedding
+
+        Returns:
+            Optional[str]: The cached answer, or None on a miss
+        """
+        with self._lock:
+            if self.size == 0:
+                return None
+
+            now = time.time()
+            scores = self.V[:self.size] @ vec.astype(np.float32, copy=False)
+            scores[now - self.created_at[:self.size] > self.ttl_seconds] = -np.inf
+
+            idx = int(np.argmax(scores))
+            if scores[idx] < self.threshold:
+                return None
+
+            self.last_used[idx] = now
+            logger.info(f"Semantic cache hit (similarity {scores[idx]:.3f})")
+            return self.answers[idx]
+
+    def add(self, vec: np.ndarray, answer: str):
+        """
+        Store an answer for a query embedding, evicting an expired or the least recently used entry when full.
+
+        Args:
+            vec (np.ndarray): Normalized query embedding
+            answer (str): Answer to cache
+        """
+        with self._lock:
+            now = time.time()
+            if self.size < self.max_size:
+                idx = self.size
+                self.size += 1
+            else:
+                expired = np.flatnonzero(now - self.created_at > self.ttl_seconds)
+                idx = int(expired[0]) if expired.size else int(np.argmin(self.last_used))
+
+            self.V[idx] = vec
+            self.answers[idx] = answer
+            self.created_at[idx] = now
+            self.last_used[idx] = now
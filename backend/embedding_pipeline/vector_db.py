@@ -1,22 +1,100 @@
 import os #file operations
-from typing import List, Dict, Optional #type hints
+import asyncio #offload blocking work from the event loop
+import threading #lazy encoder initialization
+from contextlib import contextmanager #pooled connection handling
+from typing import AsyncIterator, List, Dict, Optional, Tuple #type hints
 import logging #logging
 from dotenv import load_dotenv #parse environment variables
 import singlestoredb as s2 #singlestore database
-import torch #pytorch
 import re #regular expressions
 import json
-import math #for checking NaN values
+import numpy as np #numerical operations
 import requests
 from tenacity import retry, stop_after_attempt, wait_exponential
+import httpx #async http client
+from embedding_pipeline.semantic_cache import SemanticCache
+from embedding_pipeline.query_encoder import QueryEncoder
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Gemini is called over a shared keep-alive HTTP/2 client instead of the blocking SDK
+load_dotenv()
+_GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+_GEMINI_STREAM_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:streamGenerateContent?alt=sse"
+_GEMINI_HEADERS = {"x-goog-api-key": os.getenv('GEMINI_API_KEY') or ""}
+_PROMPT_SUFFIX = " You are a helpful recipe recommender assistant. Answer only if the question is relevant to the recipe recommendations, food based, time to cook, where the dish is most famous etc. all and only about food. If the question is not relevant to food, say 'I'm sorry, I can only help with recipe recommendations.'. Give answers in the format: Recipe name, Time to cook, Ingredients, Instructions. Give no extra information unless asked for."
+_http: Optional[httpx.AsyncClient] = None
+
+def _get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared Gemini HTTP client, creating it on first use so that
+    importing this module (e.g. from the ingestion script) opens nothing.
+    """
+    global _http
+    if _http is None or _http.is_closed:
+        _http = httpx.AsyncClient(http2=True, timeout=30, limits=httpx.Limits(max_keepalive_connections=50))
+    return _http
+
+def _extract_text(data: Dict) -> Optional[str]:
+    """
+    Return the text of the first candidate in a Gemini response payload, or None if it has none.
+    """
+    candidates = data.get("candidates") or []
+    if not candidates:
+        return None
+    parts = candidates[0].get("content", {}).get("parts") or []
+    return "".join(part.get("text", "") for part in parts) or None
+
+async def _generate_content(prompt: str) -> Optional[str]:
+    """
+    Send a prompt to Gemini and return the generated text, or None if the response has no text.
+    """
+    response = await _get_http_client().post(
+        _GEMINI_URL,
+        headers=_GEMINI_HEADERS,
+        json={"contents": [{"parts": [{"text": prompt}]}]}
+    )
+    response.raise_for_status()
+    return _extract_text(response.json())
+
+async def _stream_content(prompt: str) -> AsyncIterator[str]:
+    """
+    Send a prompt to Gemini and yield the generated text chunk by chunk as it is produced.
+    """
+    async with _get_http_client().stream(
+        "POST",
+        _GEMINI_STREAM_URL,
+        headers=_GEMINI_HEADERS,
+        json={"contents": [{"parts": [{"text": prompt}]}]}
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            text = _extract_text(json.loads(line[len("data:"):]))
+            if text:
+                yield text
+
+async def close_http_client():
+    """
+    Close the shared Gemini HTTP client, if it was created.
+    """
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
 class VectorDB:
-    def __init__(self):
+    def __init__(self, model_name: str = 'BAAI/bge-base-en-v1.5', encoder: Optional[QueryEncoder] = None):
         """
-        Initialize the vector database connection using environment variables.
+        Initialize the vector database connection pool using environment variables.
+
+        Args:
+            model_name (str): Embedding model used to encode search queries; must match
+                the model the stored recipe embeddings were generated with
+            encoder (Optional[QueryEncoder]): Existing query encoder to reuse; otherwise one
+                is loaded on first use, so ingestion-only callers never load the model
         """
         load_dotenv()
         
@@ -25,39 +103,71 @@ class VectorDB:
             raise ValueError("SINGLESTORE_CONNECTION_STRING not found in environment variables")
             
         try:
-            # Using client_side_local_infile=True might be needed depending on setup
-            self.conn = s2.connect(connection_string)
-            logger.info("Connected to SingleStore database")
+            # Connections are opened lazily and reused across requests
+            self.pool = s2.create_engine(connection_string, pool_size=20, max_overflow=10, pool_pre_ping=True)
+            logger.info("Created SingleStore connection pool")
             
         except Exception as e:
             logger.error(f"Failed to connect to database: {str(e)}")
             raise
+
+        self.model_name = model_name
+        self._encoder = encoder
+        self._encoder_lock = threading.Lock()
+
+    @property
+    def encoder(self) -> QueryEncoder:
+        """
+        Query encoder, loaded on first access.
+        """
+        if self._encoder is None:
+            with self._encoder_lock:
+                if self._encoder is None:
+                    self._encoder = QueryEncoder(self.model_name)
+                    logger.info(f"Loaded query encoder: {self.model_name}")
+        return self._encoder
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a DB-API connection from the pool, returning it to the pool on exit.
+        """
+        conn = self.pool.raw_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
     
     def create_tables(self):
         """
         Create necessary tables for storing recipe data and embeddings.
         """
-        cursor = self.conn.cursor()
-        
-        # Drop existing table if it exists to update schema
-        cursor.execute("DROP TABLE IF EXISTS recipes")
-        
-        # Create recipes table with correct vector dimension
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS recipes (
-                id INT PRIMARY KEY,
-                RecipeName VARCHAR(255),
-                TimeToCook VARCHAR(50),
-                Ingredients TEXT,
-                Instructions TEXT,
-                embedding VECTOR(768)
-            )
-        """)
-        
-        self.conn.commit()
-        logger.info("Created necessary tables with 768-dimensional vector support")
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Drop existing table if it exists to update schema
+            cursor.execute("DROP TABLE IF EXISTS recipes")
+            
+            # Create recipes table with correct vector dimension
+            # The HNSW_PQ index stores 384 one-byte product-quantization codes per vector
+            # (384 bytes per row instead of 3072); exact F32 vectors stay in the column
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS recipes (
+                    id INT PRIMARY KEY,
+                    RecipeName VARCHAR(255),
+                    TimeToCook VARCHAR(50),
+                    Ingredients TEXT,
+                    Instructions TEXT,
+                    embedding VECTOR(768),
+                    VECTOR INDEX embedding_idx (embedding) INDEX_OPTIONS '{"index_type":"HNSW_PQ","metric_type":"DOT_PRODUCT","M":16,"efConstruction":200,"m":384,"nbits":8}',
+                    FULLTEXT ft_ing (Ingredients)
+                )
+            """)
+            
+            conn.commit()
+        logger.info("Created necessary tables with 768-dimensional vector support, product-quantized HNSW index and ingredients full-text index")
         
-    def insert_recipes(self, recipes: List[Dict], batch_size: int = 50):
+    def insert_recipes(self, recipes: List[Dict], batch_size: int = 1000):
         """
         Insert recipes into the database in batches using parameterized queries.
         
@@ -65,7 +175,27 @@ class VectorDB:
             recipes (List[Dict]): List of recipes with their embeddings and metadata
             batch_size (int): Number of recipes to insert in each batch
         """
-        with self.conn.cursor() as cursor:
+        if not recipes:
+            logger.warning("No recipes to insert")
+            return
+
+        embeddings = np.asarray([recipe['embedding'] for recipe in recipes], dtype='<f4')
+        self.insert_recipes_stream(embeddings, recipes, batch_size)
+
+    def insert_recipes_stream(self, embeddings: np.ndarray, recipes: List[Dict], batch_size: int = 1000):
+        """
+        Insert one chunk of recipes with their embeddings kept as a float32 array.
+        Embeddings are sent as packed little-endian float32 bytes rather than JSON text.
+        
+        Args:
+            embeddings (np.ndarray): Embeddings of shape (len(recipes), 768)
+            recipes (List[Dict]): Recipe metadata including 'id', aligned with embeddings
+            batch_size (int): Number of recipes to insert in each batch
+        """
+        # Replace any NaN values with 0 in one vectorized pass
+        embeddings = np.nan_to_num(np.asarray(embeddings, dtype='<f4'), copy=False)
+
+        with self.connection() as conn, conn.cursor() as cursor:
             insert_sql = """
             INSERT INTO recipes (id, RecipeName, TimeToCook, Ingredients, Instructions, embedding)
             VALUES (%s, %s, %s, %s, %s, %s)
@@ -76,48 +206,29 @@ class VectorDB:
                 batch = recipes[i:i + batch_size]
                 logger.info(f"Inserting batch {i//batch_size + 1}/{(len(recipes) + batch_size - 1)//batch_size}")
                 
-                # Prepare the data for the batch
-                batch_data = []
-                for recipe in batch:
-                    try:
-                        # Check for NaN values in embedding and replace with 0
-                        embedding = recipe.get('embedding', [])
-                        if isinstance(embedding, list):
-                            # Replace any NaN values with 0
-                            embedding = [0.0 if isinstance(x, float) and math.isnan(x) else x for x in embedding]
-                        
-                        # Convert embedding to JSON array string
-                        embedding_json = json.dumps(embedding)
-                        
-                        # Prepare tuple of values in correct order
-                        # Note: Need to handle potential KeyError if a column is missing in the scraped data
-                        recipe_values = (
-                            recipe.get('id'),
-                            recipe.get('RecipeName'),
-                            recipe.get('TimeToCook'),
-                            recipe.get('Ingredients'),
-                            recipe.get('Instructions'),
-                            embedding_json # Pass the JSON string for the vector column
-                        )
-                        batch_data.append(recipe_values)
-                    except Exception as e:
-                        logger.error(f"Error preparing data for recipe {recipe.get('id', 'unknown')}: {str(e)}")
-                        # Skip this recipe if data preparation fails
-                        continue
-                
-                if not batch_data:
-                    logger.warning(f"No valid data to insert in batch {i//batch_size + 1}")
-                    continue
+                # Prepare tuple of values in correct order
+                batch_data = [
+                    (
+                        recipe.get('id'),
+                        recipe.get('RecipeName'),
+                        recipe.get('TimeToCook'),
+                        recipe.get('Ingredients'),
+                        recipe.get('Instructions'),
+                        embedding.tobytes() # Packed float32 for the vector column
+                    )
+                    for recipe, embedding in zip(batch, embeddings[i:i + batch_size])
+                ]
                 
                 # Execute the batch insert
                 try:
-                    # Use executemany for efficient batch insertion
+                    # With bare %s placeholders executemany rewrites the batch into one multi-row INSERT;
+                    # the packed float32 bytes are assigned to the VECTOR column directly
                     cursor.executemany(insert_sql, batch_data)
-                    self.conn.commit()
+                    conn.commit()
                     logger.info(f"Successfully inserted batch {i//batch_size + 1}")
                 except Exception as e:
                     logger.error(f"Error inserting batch {i//batch_size + 1}: {str(e)}")
-                    self.conn.rollback()
+                    conn.rollback()
                     # Note: Retrying with smaller batches is harder with executemany,
                     # if a batch fails, you might need to log the problematic recipes
                     # or implement more complex retry logic.
@@ -131,52 +242,36 @@ class VectorDB:
         
         Args:
             search_term (str): The search term (e.g., "chicken" or "pasta")
-            limit (int: Maximum number of results to return (default: 2)
+            limit (int): Maximum number of results to return (default: 2)
             
         Returns:
             List[Dict]: List of recipes matching the search term
         """
         try:
-            cursor = self.conn.cursor()
-            
-            # First check if we have any recipes in the database
-            cursor.execute("SELECT COUNT(*) FROM recipes")
-            count = cursor.fetchone()[0]
-            if count == 0:
-                logger.warning("No recipes found in the database")
-                return []
-            
-            # Split the search term into individual ingredients
-            ingredients = [i.strip().lower() for i in search_term.split(',') if i.strip()]
-            
-            if not ingredients:
-                logger.warning("No valid ingredients provided in the search term")
+            if not search_term.strip():
+                logger.warning("Empty search term provided")
                 return []
+
+            # Embeddings are normalized, so the dot product is the cosine similarity
+            query_vector = self.encoder.encode(search_term)
             
-            # Construct the WHERE clause dynamically for each ingredient
-            where_clauses = ["LOWER(Ingredients) LIKE %s" for _ in ingredients]
-            where_clause_str = " OR ".join(where_clauses)
-            
-            # Simple query to find recipes containing any of the search terms
-            query = f"""
+            # Nearest-neighbour probe served by the product-quantized HNSW vector index
+            query = """
                 SELECT 
                     RecipeName,
                     TimeToCook,
                     Ingredients,
-                    Instructions
+                    Instructions,
+                    embedding <*> (%s :> VECTOR(768)) AS score
                 FROM recipes
-                WHERE {where_clause_str}
+                ORDER BY score DESC
                 LIMIT %s
             """
             
-            # Prepare parameters for the query
-            params = [f'%{ingredient}%' for ingredient in ingredients]
-            params.append(limit)
-            
-            # Execute the query with parameters
-            cursor.execute(query, params)
-            
-            results = cursor.fetchall()
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, (json.dumps(query_vector.tolist()), limit))
+                results = cursor.fetchall()
             
             if not results:
                 logger.warning(f"No recipes found matching: '{search_term}'")
@@ -191,7 +286,7 @@ class VectorDB:
                         'TimeToCook': row[1],
                         'Ingredients': row[2],
                         'Instructions': row[3],
-                        'similarity': 1.0  # Simple matching, so similarity is 1.0
+                        'similarity': float(row[4])
                     }
                     similar_recipes.append(recipe)
                 except (TypeError, ValueError) as e:
@@ -205,22 +300,78 @@ class VectorDB:
             logger.error(f"Error finding similar recipes: {str(e)}")
             raise
 
+    def find_recipes_by_ingredients(self, ingredients: List[str], limit: int = 2) -> List[Dict]:
+        """
+        Find recipes containing the given ingredients using the full-text index on Ingredients.
+        
+        Args:
+            ingredients (List[str]): Ingredients to look for (e.g., ['chicken', 'tomato'])
+            limit (int): Maximum number of results to return (default: 2)
+            
+        Returns:
+            List[Dict]: List of recipes ranked by full-text relevance
+        """
+        try:
+            terms = ' '.join(i.strip() for i in ingredients if i.strip())
+            if not terms:
+                logger.warning("No valid ingredients provided")
+                return []
+            
+            # A single inverted-index lookup; the index is case-insensitive so no LOWER() is needed
+            query = """
+                SELECT 
+                    RecipeName,
+                    TimeToCook,
+                    Ingredients,
+                    Instructions,
+                    MATCH(Ingredients) AGAINST (%s) AS score
+                FROM recipes
+                WHERE MATCH(Ingredients) AGAINST (%s)
+                ORDER BY score DESC
+                LIMIT %s
+            """
+            
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, (terms, terms, limit))
+                results = cursor.fetchall()
+            
+            recipes = [
+                {
+                    'RecipeName': row[0],
+                    'TimeToCook': row[1],
+                    'Ingredients': row[2],
+                    'Instructions': row[3],
+                    'similarity': float(row[4])
+                }
+                for row in results
+            ]
+            logger.info(f"Found {len(recipes)} recipes containing: '{terms}'")
+            return recipes
+            
+        except Exception as e:
+            logger.error(f"Error finding recipes by ingredients: {str(e)}")
+            raise
+
     def close(self):
         """
-        Close the database connection.
+        Close all pooled database connections.
         """
-        if self.conn:
-            self.conn.close()
-            logger.info("Database connection closed")
+        if self.pool:
+            self.pool.dispose()
+            logger.info("Database connection pool closed")
 
 class CookingAssistant:
-    def __init__(self, vector_db: 'VectorDB'):
+    def __init__(self, vector_db: 'VectorDB', cache: Optional[SemanticCache] = None):
         """
         Initialize the cooking assistant with VectorDB.
+
+        Args:
+            vector_db (VectorDB): Database whose query encoder is reused to embed messages
+            cache (Optional[SemanticCache]): Response cache; a default one is created if omitted
         """
-        load_dotenv()
-        
         self.vector_db = vector_db
+        self.cache = cache if cache is not None else SemanticCache()
         self.user_preferences = {
             'dietary_restrictions': [],
             'cooking_skill_level': 'intermediate',
@@ -228,23 +379,29 @@ class CookingAssistant:
             'last_recipe': None
         }
 
-    def process_message(self, message: str) -> str:
+    def _build_prompt(self, message: str) -> str:
+        """
+        Wrap a user message with the recipe-assistant instructions.
+        """
+        return message + _PROMPT_SUFFIX
+
+    async def process_message(self, message: str) -> str:
         """
         Process a user message and return an appropriate response.
-        This version directly uses the Gemini API for content generation.
+        Semantically similar earlier messages are answered from the cache,
+        everything else goes to the Gemini API.
         """
         try:
-            import google.generativeai as genai # Corrected import statement
-            load_dotenv()
-            # Use the user's provided API usage example
-            api_key=os.getenv('GEMINI_API_KEY')
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            prompt = (message +" You are a helpful recipe recommender assistant. Answer only if the question is relevant to the recipe recommendations, food based, time to cook, where the dish is most famous etc. all and only about food. If the question is not relevant to food, say 'I'm sorry, I can only help with recipe recommendations.'. Give answers in the format: Recipe name, Time to cook, Ingredients, Instructions. Give no extra information unless asked for.")
-            response = model.generate_content(prompt)
+            query_vector = await asyncio.to_thread(self.vector_db.encoder.encode, message)
+            cached = self.cache.query(query_vector)
+            if cached is not None:
+                return cached
+
+            response_text = await _generate_content(self._build_prompt(message))
             
-            if hasattr(response, "text") and response.text:
-                return response.text
+            if response_text:
+                self.cache.add(query_vector, response_text)
+                return response_text
             else:
                 return "I apologize, but I couldn't generate a response for your query. Please try again."
             
@@ -252,9 +409,38 @@ class CookingAssistant:
             logger.error(f"Error generating response with Gemini API: {str(e)}")
             return "I apologize, but I encountered an error while trying to generate a response. Please ensure your GEMINI_API_KEY is correct and try again."
 
+    async def stream_message(self, message: str) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Process a user message and yield the response as it is generated.
+        Cached answers are yielded in one piece; otherwise Gemini's output is
+        streamed through and cached once complete.
+
+        Yields:
+            Tuple[str, str]: ('message', text chunk), or ('error', text) once if the
+                response failed; an error replaces any text streamed before it
+        """
+        try:
+            query_vector = await asyncio.to_thread(self.vector_db.encoder.encode, message)
+            cached = self.cache.query(query_vector)
+            if cached is not None:
+                yield 'message', cached
+                return
+
+            chunks = []
+            async for chunk in _stream_content(self._build_prompt(message)):
+                chunks.append(chunk)
+                yield 'message', chunk
+
+            if chunks:
+                self.cache.add(query_vector, "".join(chunks))
+            else:
+                yield 'error', "I apologize, but I couldn't generate a response for your query. Please try again."
+            
+        except Exception as e:
+            logger.error(f"Error streaming response from Gemini API: {str(e)}")
+            yield 'error', "I apologize, but I encountered an error while trying to generate a response. Please ensure your GEMINI_API_KEY is correct and try again."
+
 
-print(f"CUDA available: {torch.cuda.is_available()}")
-print(f"GPU device: {torch.cuda.get_device_name(0) if torch.cuda.is_available() else 'None'}")
 
 #  # import google.genai as genai # Corrected import statement
 #             load_dotenv()
@@ -15,18 +15,13 @@ def main():
     vector_db = VectorDB()
     
     try:
-        # Process data
         logger.info("Starting data processing pipeline")
-        recipe_texts, metadata = data_processor.get_processed_data()
-        
-        # Generate embeddings
-        logger.info("Generating embeddings")
-        processed_recipes = embedding_generator.process_recipes(recipe_texts, metadata)
-        
-        # Store in database
-        logger.info("Storing in database")
         vector_db.create_tables()
-        vector_db.insert_recipes(processed_recipes)
+        
+        # Stream chunks through processing, embedding and storage so only one chunk is held in memory
+        chunks = data_processor.get_processed_data()
+        for embeddings, metadata in embedding_generator.process_recipes(chunks, source_path=data_processor.csv_path):
+            vector_db.insert_recipes_stream(embeddings, metadata)
         
         logger.info("Successfully completed data processing and storage")
         
@@ -1,38 +1,68 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from embedding_pipeline.vector_db import VectorDB
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def search_recipes_by_keywords(keywords: List[str], limit: int = 3) -> List[Dict]:
+# Shared VectorDB (connection pool + query encoder), created on first use
+_vector_db: Optional[VectorDB] = None
+
+def get_vector_db() -> VectorDB:
+    """
+    Return the process-wide VectorDB instance, creating it on first use.
+    """
+    global _vector_db
+    if _vector_db is None:
+        _vector_db = VectorDB()
+    return _vector_db
+
+def search_recipes_by_keywords(keywords: List[str], limit: int = 3, vector_db: Optional[VectorDB] = None) -> List[Dict]:
     """
     Search for recipes using a list of ingredients.
     
     Args:
         keywords (List[str]): List of ingredients to search for (e.g., ['chicken', 'tomato', 'onion'])
         limit (int): Maximum number of recipes to return
+        vector_db (Optional[VectorDB]): Database to search; defaults to the shared instance
         
     Returns:
         List[Dict]: List of recipes matching the ingredients, sorted by relevance
     """
     try:
-        # Initialize the vector database connection
-        vector_db = VectorDB()
+        if vector_db is None:
+            vector_db = get_vector_db()
         
         # Combine keywords into a search term
         search_term = ' '.join(keywords)
         
         # Search for similar recipes
-        results = vector_db.find_similar_recipes(search_term, limit)
+        return vector_db.find_similar_recipes(search_term, limit)
         
-        # Close the database connection
-        vector_db.close()
+    except Exception as e:
+        logger.error(f"Error searching recipes: {str(e)}")
+        raise
+
+def search_recipes_by_ingredients(ingredients: List[str], limit: int = 3, vector_db: Optional[VectorDB] = None) -> List[Dict]:
+    """
+    Search for recipes that literally contain the given ingredients, using the full-text index.
+    
+    Args:
+        ingredients (List[str]): List of ingredients to look for (e.g., ['chicken', 'tomato', 'onion'])
+        limit (int): Maximum number of recipes to return
+        vector_db (Optional[VectorDB]): Database to search; defaults to the shared instance
+        
+    Returns:
+        List[Dict]: List of recipes containing the ingredients, sorted by relevance
+    """
+    try:
+        if vector_db is None:
+            vector_db = get_vector_db()
         
-        return results
+        return vector_db.find_recipes_by_ingredients(ingredients, limit)
         
     except Exception as e:
-        logger.error(f"Error searching recipes: {str(e)}")
+        logger.error(f"Error searching recipes by ingredients: {str(e)}")
         raise
 
 # Example usage
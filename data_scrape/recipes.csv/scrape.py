@@ -1,4 +1,5 @@
-import requests as req
+import asyncio
+import httpx
 from bs4 import BeautifulSoup
 import pandas as pd
 
@@ -8,9 +9,31 @@ main_url = "https://www.food.com/ideas/top-dessert-recipes-6930?ref=nav#c-791390
 # https://www.food.com/ideas/top-dessert-recipes-6930?ref=nav#c-791390
 # https://www.food.com/ideas/easy-lunch-recipes-7007?ref=nav#c-821312
 
+MAX_CONCURRENT_REQUESTS = 8
+
+async def fetch_all(urls):
+    # fetch pages concurrently over a shared connection pool, a few at a time to avoid throttling;
+    # pages that fail (timeouts, 403/429, ...) come back as None instead of aborting the run
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def fetch(client, url):
+        async with semaphore:
+            try:
+                response = await client.get(url)
+                response.raise_for_status()
+                return response
+            except httpx.HTTPError as e:
+                print(f"Skipping {url}: {e}")
+                return None
+
+    async with httpx.AsyncClient(http2=True, follow_redirects=True, timeout=30) as client:
+        return await asyncio.gather(*[fetch(client, url) for url in urls])
+
 # get the recipe links from the main page
-html_text = req.get(main_url)
-soup = BeautifulSoup(html_text.text, 'html.parser')
+html_text = asyncio.run(fetch_all([main_url]))[0]
+if html_text is None:
+    raise SystemExit(f"Could not fetch {main_url}")
+soup = BeautifulSoup(html_text.text, 'lxml')
 
 title_divs = soup.find_all('h2', class_='title')
 
@@ -26,9 +49,12 @@ for div in title_divs:
 
 recipes_data = []
 
-for recipe_name, link in zip(recipe_names, recipe_links):
-    html_text = req.get(link)
-    soup = BeautifulSoup(html_text.text, 'html.parser')
+recipe_pages = asyncio.run(fetch_all(recipe_links))
+
+for recipe_name, html_text in zip(recipe_names, recipe_pages):
+    if html_text is None:
+        continue
+    soup = BeautifulSoup(html_text.text, 'lxml')
 
     # Ingredients
     ingredients_list = soup.find('ul', class_='ingredient-list')
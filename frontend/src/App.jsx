@@ -7,6 +7,7 @@ function App() {
   const [isListening, setIsListening] = useState(false);
   const messagesEndRef = useRef(null);
   const recognitionRef = useRef(null);
+  const nextMessageIdRef = useRef(0);
 
   useEffect(() => {
     // Initialize speech recognition
@@ -49,12 +50,21 @@ function App() {
     if (!inputText.trim()) return;
 
     // Add user message
-    const userMessage = { text: inputText, sender: "user" };
+    const userMessage = { id: nextMessageIdRef.current++, text: inputText, sender: "user" };
     setMessages(prev => [...prev, userMessage]);
     setInputText("");
 
+    // The bot reply is tracked by id so later messages can't receive its chunks
+    const botMessageId = nextMessageIdRef.current++;
+    let placeholderAdded = false;
+    const updateBotMessage = (update) => {
+      setMessages(prev => prev.map(message =>
+        message.id === botMessageId ? { ...message, text: update(message.text) } : message
+      ));
+    };
+
     try {
-      const res = await fetch(`/api/chat`, {
+      const res = await fetch(`/api/chat/stream`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -62,19 +72,49 @@ function App() {
         body: JSON.stringify({ message: inputText }),
       });
       
-      if (!res.ok) {
+      if (!res.ok || !res.body) {
         throw new Error(`HTTP error! status: ${res.status}`);
       }
-      
-      const data = await res.json();
-      
-      if (!data.response) {
-        throw new Error('No response from server');
+
+      // Add an empty bot message and grow it as server-sent events arrive
+      setMessages(prev => [...prev, { id: botMessageId, text: "", sender: "bot" }]);
+      placeholderAdded = true;
+
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let receivedText = false;
+      let done = false;
+
+      while (!done) {
+        const { value, done: streamDone } = await reader.read();
+        if (streamDone) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // SSE events are separated by a blank line
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+        for (const event of events) {
+          if (event.startsWith("event: done")) {
+            done = true;
+            break;
+          }
+          const dataLine = event.split("\n").find(line => line.startsWith("data: "));
+          if (!dataLine) continue;
+          const text = JSON.parse(dataLine.slice("data: ".length));
+          if (event.startsWith("event: error")) {
+            // Replace any partial answer with the error message
+            updateBotMessage(() => text);
+          } else {
+            updateBotMessage(current => current + text);
+          }
+          receivedText = true;
+        }
       }
 
-      // Add bot response
-      const botMessage = { text: data.response, sender: "bot" };
-      setMessages(prev => [...prev, botMessage]);
+      if (!receivedText) {
+        throw new Error('No response from server');
+      }
     } catch (err) {
       console.error('Error:', err);
       // Add error message
@@ -82,7 +122,11 @@ function App() {
         text: "Sorry, I couldn't process your request at the moment. Please try again.", 
         sender: "bot" 
       };
-      setMessages(prev => [...prev, errorMessage]);
+      if (placeholderAdded) {
+        updateBotMessage(() => errorMessage.text);
+      } else {
+        setMessages(prev => [...prev, { id: botMessageId, ...errorMessage }]);
+      }
     }
   };
 